@@ -2,6 +2,9 @@
  * Audio processing client for bidirectional audio AI communication
  * Refactored to use an event emitter pattern for robust state management.
  */
+// Tag byte prefixed to binary WebSocket frames that carry raw PCM audio
+const AUDIO_FRAME_TAG = 0x01;
+
 class AudioClient extends EventTarget {
     constructor(serverUrl = null) {
         super();
@@ -63,6 +66,7 @@ class AudioClient extends EventTarget {
 
         return new Promise((resolve, reject) => {
             this.ws = new WebSocket(this.serverUrl);
+            this.ws.binaryType = 'arraybuffer';
 
             this.ws.onopen = () => {
                 console.log('WebSocket connection established');
@@ -85,14 +89,21 @@ class AudioClient extends EventTarget {
             };
 
             this.ws.onmessage = async (event) => {
+                // Audio arrives as binary frames: one tag byte followed by 16-bit PCM
+                if (event.data instanceof ArrayBuffer) {
+                    const tag = new Uint8Array(event.data, 0, 1)[0];
+                    if (tag === AUDIO_FRAME_TAG) {
+                        await this.playAudio(event.data.slice(1));
+                        this.dispatchEvent(new CustomEvent('audio'));
+                    }
+                    return;
+                }
+
                 const message = JSON.parse(event.data);
                 if (message.type === 'ready') {
                     this.isConnected = true;
                     resolve();
                 }
-                if (message.type === 'audio') {
-                    await this.playAudio(message.data);
-                }
                 if (message.type === 'turn_complete') {
                     this.isModelSpeaking = false;
                 }
@@ -163,13 +174,10 @@ class AudioClient extends EventTarget {
                 
                 // Send to server if connected
                 if (this.isConnected && this.isRecording) {
-                    const audioBuffer = new Uint8Array(int16Data.buffer);
-                    const base64Audio = this._arrayBufferToBase64(audioBuffer);
-                    
-                    this.ws.send(JSON.stringify({
-                        type: 'audio',
-                        data: base64Audio
-                    }));
+                    const frame = new Uint8Array(1 + int16Data.byteLength);
+                    frame[0] = AUDIO_FRAME_TAG;
+                    frame.set(new Uint8Array(int16Data.buffer), 1);
+                    this.ws.send(frame);
                 }
             };
             
@@ -223,12 +231,9 @@ class AudioClient extends EventTarget {
         }
     }
     
-    // Decode and play received audio
-    async playAudio(base64Audio) {
+    // Queue and play received PCM audio
+    async playAudio(audioData) {
         try {
-            // Decode the base64 audio data
-            const audioData = this._base64ToArrayBuffer(base64Audio);
-
             // Create an audio context if needed
             if (!this.audioContext || this.audioContext.state === 'closed') {
                 this.audioContext = new (window.AudioContext || window.webkitAudioContext)({
@@ -400,26 +405,4 @@ class AudioClient extends EventTarget {
 
         this.isConnected = false;
     }
-    
-    // Utility: Convert ArrayBuffer to Base64
-    _arrayBufferToBase64(buffer) {
-        let binary = '';
-        const bytes = new Uint8Array(buffer);
-        const len = bytes.byteLength;
-        for (let i = 0; i < len; i++) {
-            binary += String.fromCharCode(bytes[i]);
-        }
-        return btoa(binary);
-    }
-    
-    // Utility: Convert Base64 to ArrayBuffer
-    _base64ToArrayBuffer(base64) {
-        const binaryString = atob(base64);
-        const len = binaryString.length;
-        const bytes = new Uint8Array(len);
-        for (let i = 0; i < len; i++) {
-            bytes[i] = binaryString.charCodeAt(i);
-        }
-        return bytes.buffer;
-    }
 }
\ No newline at end of file
@@ -30,6 +30,7 @@ async function initializeAudioClient() {
 
     let currentResponseText = '';
     let currentResponseElement = null;
+    let currentUserTranscript = '';
 
     // Add event listeners instead of assigning callbacks
     audioClient.addEventListener('ready', () => {
@@ -71,16 +72,18 @@ async function initializeAudioClient() {
     });
 
     audioClient.addEventListener('text', (event) => {
+        // Pieces are raw transcription chunks (the server may have joined several),
+        // so append them verbatim; they carry their own spacing.
         const text = event.detail;
-        if (text && text.trim()) {
+        if (text && (currentResponseElement || text.trim())) {
             if (!currentResponseElement || !document.body.contains(currentResponseElement)) {
-                currentResponseText = text;
+                currentResponseText = text.trimStart();
                 currentResponseElement = document.createElement('div');
                 currentResponseElement.className = 'chat-message assistant-message';
-                currentResponseElement.textContent = text;
+                currentResponseElement.textContent = currentResponseText;
                 chatMessages.appendChild(currentResponseElement);
             } else {
-                currentResponseText += ' ' + text.trim();
+                currentResponseText += text;
                 currentResponseElement.textContent = currentResponseText;
             }
             chatMessages.scrollTop = chatMessages.scrollHeight;
@@ -109,13 +112,18 @@ async function initializeAudioClient() {
         currentResponseElement = null;
     });
 
-    // New event listener for user transcript
-    audioClient.addEventListener('user_transcript', (event) => {
-        const transcript = event.detail;
+    // The server sends only the new piece of the user transcript; accumulate it until
+    // user_transcript_end, which the server sends at the end of every turn (interrupted or not)
+    audioClient.addEventListener('user_transcript_end', () => {
+        currentUserTranscript = '';
+    });
+
+    audioClient.addEventListener('user_transcript_delta', (event) => {
+        currentUserTranscript += event.detail;
         const tempMessages = document.querySelectorAll('.user-message');
         if (tempMessages.length > 0) {
             const lastMessage = tempMessages[tempMessages.length - 1];
-            lastMessage.textContent = transcript;
+            lastMessage.textContent = currentUserTranscript;
         }
     });
 
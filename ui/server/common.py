@@ -4,6 +4,7 @@ import logging
 import websockets
 import traceback
 import os
+from weakref import WeakValueDictionary
 from websockets.exceptions import ConnectionClosed
 
 # Set up logging
@@ -17,6 +18,22 @@ VOICE_NAME = "Aoede" # A professional and clear voice for the advisor
 # Audio sample rates
 RECEIVE_SAMPLE_RATE = 24000  # Rate of audio received from Gemini
 SEND_SAMPLE_RATE = 16000     # Rate of audio sent to Gemini
+SEND_AUDIO_MIME_TYPE = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+
+# Binary WebSocket frames carry raw 16-bit PCM prefixed with this tag byte
+AUDIO_FRAME_TAG = b"\x01"
+
+# Max inbound audio frames buffered per client before the oldest is dropped
+AUDIO_QUEUE_MAXSIZE = 32
+
+# Window (seconds) over which partial text/transcript pieces are coalesced into one message
+TEXT_FLUSH_INTERVAL = 0.03
+
+# Invariant control messages, encoded once. Kept as str so they go out as text frames.
+READY_MESSAGE = json.dumps({"type": "ready"})
+TURN_COMPLETE_MESSAGE = json.dumps({"type": "turn_complete"})
+INTERRUPTED_MESSAGE = json.dumps({"type": "interrupted"})
+USER_TRANSCRIPT_END_MESSAGE = json.dumps({"type": "user_transcript_end"})
 
 def load_system_instruction(filepath="system_prompt.txt"):
     """Loads the system instruction from a file."""
@@ -28,10 +45,10 @@ def load_system_instruction(filepath="system_prompt.txt"):
         with open(file_path, "r") as f:
             return f.read()
     except FileNotFoundError:
-        logger.error(f"Error: System instruction file not found at {file_path}")
+        logger.error("Error: System instruction file not found at %s", file_path)
         return "" # Return empty string to prevent crash, though agent will be uninstructed
     except Exception as e:
-        logger.error(f"Error loading system instruction: {e}")
+        logger.error("Error loading system instruction: %s", e)
         return ""
 
 SYSTEM_INSTRUCTION = load_system_instruction()
@@ -43,28 +60,39 @@ class BaseWebSocketServer:
     def __init__(self, host="0.0.0.0", port=8080):
         self.host = host
         self.port = int(os.environ.get('PORT', port)) # Use PORT from env var if available
-        self.active_clients = {}
+        # Entries drop out automatically once a client's websocket is garbage collected
+        self.active_clients = WeakValueDictionary()
 
     async def start(self):
-        logger.info(f"Starting WebSocket server on {self.host}:{self.port}")
-        async with websockets.serve(self.handle_client, self.host, self.port):
+        logger.info("Starting WebSocket server on %s:%s", self.host, self.port)
+        # Eager tasks (Python 3.12+) run synchronously until their first real await,
+        # skipping a loop iteration for each task created by the per-client TaskGroup.
+        if hasattr(asyncio, "eager_task_factory"):
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        # PCM audio does not compress, so skip permessage-deflate. Client frames are
+        # ~8 KiB (4096 int16 samples), so 64 KiB caps message size with ample headroom.
+        async with websockets.serve(
+            self.handle_client,
+            self.host,
+            self.port,
+            compression=None,
+            max_size=2**16,
+            write_limit=2**16,
+        ):
             await asyncio.Future()  # Run forever
 
     async def handle_client(self, websocket):
         """Handle a new WebSocket client connection"""
         client_id = id(websocket)
-        logger.info(f"New client connected: {client_id}")
-        await websocket.send(json.dumps({"type": "ready"}))
+        logger.info("New client connected: %s", client_id)
+        await websocket.send(READY_MESSAGE)
         try:
             await self.process_audio(websocket, client_id)
         except ConnectionClosed:
-            logger.info(f"Client disconnected: {client_id}")
+            logger.info("Client disconnected: %s", client_id)
         except Exception as e:
-            logger.error(f"Error handling client {client_id}: {e}")
+            logger.error("Error handling client %s: %s", client_id, e)
             logger.error(traceback.format_exc())
-        finally:
-            if client_id in self.active_clients:
-                del self.active_clients[client_id]
 
     async def process_audio(self, websocket, client_id):
         """Abstract method for processing audio from the client."""
@@ -1,6 +1,5 @@
 import asyncio
-import json
-import base64
+import orjson
 import websockets
 
 # Initialize Vertex AI early, as it's a prerequisite for ADK components
@@ -42,10 +41,24 @@ from common import (
     logger,
     MODEL,
     VOICE_NAME,
-    SEND_SAMPLE_RATE,
+    SEND_AUDIO_MIME_TYPE,
     SYSTEM_INSTRUCTION,
+    AUDIO_FRAME_TAG,
+    AUDIO_QUEUE_MAXSIZE,
+    TEXT_FLUSH_INTERVAL,
+    TURN_COMPLETE_MESSAGE,
+    INTERRUPTED_MESSAGE,
+    USER_TRANSCRIPT_END_MESSAGE,
 )
 
+APP_NAME = "wealth_advisor_assistant"
+# All connections share one ADK user; sessions are per connection. InMemorySessionService
+# never drops a user's (possibly empty) session dict, so a per-connection user id would leak.
+USER_ID = "wealth_advisor_user"
+
+class _ClientDisconnected(Exception):
+    """Raised by the reader task to tear down a client's TaskGroup once its websocket closes."""
+
 class ADKWebSocketServer(BaseWebSocketServer):
     """WebSocket server implementation using Google ADK."""
 
@@ -64,24 +77,13 @@ class ADKWebSocketServer(BaseWebSocketServer):
             ],
         )
         self.session_service = InMemorySessionService()
-
-    async def process_audio(self, websocket, client_id):
-        self.active_clients[client_id] = websocket
-        
-        # Explicitly create the session so the runner can find it.
-        await self.session_service.create_session(
-            app_name="wealth_advisor_assistant",
-            user_id=f"user_{client_id}",
-            session_id=f"session_{client_id}",
-        )
-
-        runner = Runner(
-            app_name="wealth_advisor_assistant",
+        # The runner and run config are identical for every client, so build them once.
+        self.runner = Runner(
+            app_name=APP_NAME,
             agent=self.agent,
             session_service=self.session_service,
         )
-        live_request_queue = LiveRequestQueue()
-        run_config = RunConfig(
+        self.run_config = RunConfig(
             streaming_mode=StreamingMode.BIDI,
             speech_config=SpeechConfig(
                 voice_config=VoiceConfig(
@@ -92,83 +94,165 @@ class ADKWebSocketServer(BaseWebSocketServer):
             output_audio_transcription=google_genai_types.AudioTranscriptionConfig(),
             session_resumption=google_genai_types.SessionResumptionConfig(),
         )
-        audio_queue = asyncio.Queue()
-
-        async with asyncio.TaskGroup() as tg:
-            # Task to process incoming WebSocket messages from the client
-            async def handle_websocket_messages():
-                async for message in websocket:
-                    try:
-                        data = json.loads(message)
-                        if data.get("type") == "audio":
-                            audio_bytes = base64.b64decode(data.get("data", ""))
-                            await audio_queue.put(audio_bytes)
-                    except json.JSONDecodeError:
-                        logger.error("Invalid JSON message received")
-                    except Exception as e:
-                        logger.error(f"Error processing websocket message: {e}")
-
-            # Task to send audio from our internal queue to the ADK
-            async def process_and_send_audio():
-                while True:
-                    data = await audio_queue.get()
-                    live_request_queue.send_realtime(
-                        google_genai_types.Blob(data=data, mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}")
-                    )
-                    audio_queue.task_done()
-
-            # Task to receive and process responses from the ADK
-            async def receive_and_process_responses():
-                interrupted_in_turn = False
-                user_transcript = ""
-
-                # CORRECTED: Call run_live with user_id and session_id.
-                async for event in runner.run_live(
-                    user_id=f"user_{client_id}",
-                    session_id=f"session_{client_id}",
-                    live_request_queue=live_request_queue,
-                    run_config=run_config,
-                ):
-                    if event.content and event.content.parts:
-                        for part in event.content.parts:
-                            # Handle agent audio output
-                            if hasattr(part, "inline_data") and part.inline_data:
-                                b64_audio = base64.b64encode(part.inline_data.data).decode("utf-8")
-                                await websocket.send(json.dumps({"type": "audio", "data": b64_audio}))
-
-                            # Handle agent text output (transcription of its speech)
-                            if hasattr(part, "text") and part.text and event.content.role == "model":
-                                is_partial = not hasattr(part, 'is_final') or not part.is_final
-                                if is_partial:
-                                     await websocket.send(json.dumps({"type": "text", "data": part.text}))
-
-                            # Handle user text input (transcription of user speech)
-                            if hasattr(part, "text") and part.text and event.content.role == "user":
-                                user_transcript += part.text
-                                await websocket.send(json.dumps({"type": "user_transcript", "data": user_transcript}))
-
-                    # Handle interruption event
-                    if event.actions.state_delta.get("interrupted", False) and not interrupted_in_turn:
-                        logger.info("🤐 Interruption detected")
-                        await websocket.send(json.dumps({"type": "interrupted"}))
-                        interrupted_in_turn = True
-
-                    # Handle turn completion event
-                    if event.actions.state_delta.get("turn_complete", False):
-                        if not interrupted_in_turn:
-                            logger.info("✅ Turn complete")
-                            await websocket.send(json.dumps({"type": "turn_complete"}))
-
-                        if user_transcript.strip():
-                            logger.info(f"User transcript: '{user_transcript.strip()}'")
-
-                        interrupted_in_turn = False
-                        user_transcript = ""
-
-            # Start all concurrent tasks
-            tg.create_task(handle_websocket_messages())
-            tg.create_task(process_and_send_audio())
-            tg.create_task(receive_and_process_responses())
+
+    async def process_audio(self, websocket, client_id):
+        self.active_clients[client_id] = websocket
+        
+        # Explicitly create the session so the runner can find it.
+        await self.session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=f"session_{client_id}",
+        )
+
+        live_request_queue = LiveRequestQueue()
+        audio_queue = asyncio.Queue(maxsize=AUDIO_QUEUE_MAXSIZE)
+        # Partial text waiting to be sent, keyed by outbound message type
+        pending_text = {"text": [], "user_transcript_delta": []}
+        text_pending = asyncio.Event()
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                # Task to process incoming WebSocket messages from the client
+                async def handle_websocket_messages():
+                    async for message in websocket:
+                        try:
+                            # Audio arrives as binary frames; text frames are JSON control messages
+                            if isinstance(message, bytes):
+                                if message[:1] == AUDIO_FRAME_TAG:
+                                    audio_bytes = message[1:]
+                                    try:
+                                        audio_queue.put_nowait(audio_bytes)
+                                    except asyncio.QueueFull:
+                                        # Drop the oldest frame so the stream stays close to real time
+                                        audio_queue.get_nowait()
+                                        audio_queue.task_done()
+                                        audio_queue.put_nowait(audio_bytes)
+                                        logger.warning("Audio queue full, dropped oldest frame for client %s", client_id)
+                                continue
+                            # Control messages (e.g. "end") currently need no server-side handling
+                            orjson.loads(message)
+                        except orjson.JSONDecodeError:
+                            logger.error("Invalid JSON message received")
+                        except Exception as e:
+                            logger.error("Error processing websocket message: %s", e)
+
+                    # The client closed cleanly. End the live session and cancel the sibling
+                    # tasks, which would otherwise keep the group (and session) alive forever.
+                    live_request_queue.close()
+                    raise _ClientDisconnected()
+
+                # Task to send audio from our internal queue to the ADK
+                async def process_and_send_audio():
+                    while True:
+                        batch = [await audio_queue.get()]
+                        # Drain any backlog so it goes out as one contiguous PCM blob
+                        while True:
+                            try:
+                                batch.append(audio_queue.get_nowait())
+                            except asyncio.QueueEmpty:
+                                break
+                        data = batch[0] if len(batch) == 1 else b"".join(batch)
+                        live_request_queue.send_realtime(
+                            google_genai_types.Blob(data=data, mime_type=SEND_AUDIO_MIME_TYPE)
+                        )
+                        for _ in batch:
+                            audio_queue.task_done()
+
+                # Send buffered text now; also called before control messages so they never overtake it
+                async def flush_pending_text():
+                    text_pending.clear()
+                    for message_type, pieces in pending_text.items():
+                        if pieces:
+                            data = "".join(pieces)
+                            pieces.clear()
+                            await websocket.send(orjson.dumps({"type": message_type, "data": data}).decode())
+
+                # Task to coalesce partial text into one message per flush window
+                async def flush_text_periodically():
+                    while True:
+                        await text_pending.wait()
+                        await asyncio.sleep(TEXT_FLUSH_INTERVAL)
+                        await flush_pending_text()
+
+                # Task to receive and process responses from the ADK
+                async def receive_and_process_responses():
+                    interrupted_in_turn = False
+                    user_transcript_parts = []
+
+                    # CORRECTED: Call run_live with user_id and session_id.
+                    async for event in self.runner.run_live(
+                        user_id=USER_ID,
+                        session_id=f"session_{client_id}",
+                        live_request_queue=live_request_queue,
+                        run_config=self.run_config,
+                    ):
+                        if event.content and event.content.parts:
+                            role = event.content.role
+                            audio_chunks = []
+                            for part in event.content.parts:
+                                # Collect agent audio output; it is sent once per event below
+                                inline_data = getattr(part, "inline_data", None)
+                                if inline_data:
+                                    audio_chunks.append(inline_data.data)
+
+                                text = getattr(part, "text", None)
+                                if not text:
+                                    continue
+
+                                # Handle agent text output (transcription of its speech)
+                                if role == "model":
+                                    if not getattr(part, "is_final", False):
+                                        pending_text["text"].append(text)
+                                        text_pending.set()
+
+                                # Handle user text input (transcription of user speech)
+                                elif role == "user":
+                                    user_transcript_parts.append(text)
+                                    pending_text["user_transcript_delta"].append(text)
+                                    text_pending.set()
+
+                            # Coalesce all audio parts of this event into a single binary frame
+                            if audio_chunks:
+                                await websocket.send(b"".join((AUDIO_FRAME_TAG, *audio_chunks)))
+
+                        # Handle interruption event
+                        if event.actions.state_delta.get("interrupted", False) and not interrupted_in_turn:
+                            logger.debug("Interruption detected")
+                            await flush_pending_text()
+                            await websocket.send(INTERRUPTED_MESSAGE)
+                            interrupted_in_turn = True
+
+                        # Handle turn completion event
+                        if event.actions.state_delta.get("turn_complete", False):
+                            await flush_pending_text()
+                            if not interrupted_in_turn:
+                                logger.debug("Turn complete")
+                                await websocket.send(TURN_COMPLETE_MESSAGE)
+
+                            user_transcript = "".join(user_transcript_parts).strip()
+                            if user_transcript:
+                                logger.info("User transcript: '%s'", user_transcript)
+
+                            interrupted_in_turn = False
+                            user_transcript_parts.clear()
+                            # Sent even for interrupted turns so the client resets its transcript in step
+                            await websocket.send(USER_TRANSCRIPT_END_MESSAGE)
+
+                # Start all concurrent tasks
+                tg.create_task(handle_websocket_messages())
+                tg.create_task(process_and_send_audio())
+                tg.create_task(receive_and_process_responses())
+                tg.create_task(flush_text_periodically())
+        except* _ClientDisconnected:
+            pass
+        finally:
+            # Drop the session on disconnect so reconnecting clients don't accumulate sessions.
+            await self.session_service.delete_session(
+                app_name=APP_NAME,
+                user_id=USER_ID,
+                session_id=f"session_{client_id}",
+            )
 
 # This part is for Gunicorn to find the app
 server = ADKWebSocketServer()
@@ -176,6 +260,12 @@ app = server.start # Gunicorn will await this coroutine
 
 if __name__ == "__main__":
     try:
+        # uvloop is optional; fall back to the default asyncio loop if it is unavailable.
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            logger.info("uvloop not available, using the default asyncio event loop")
         asyncio.run(server.start())
     except KeyboardInterrupt:
         logger.info("Exiting application...")
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tools
+
+
+@pytest.mark.parametrize(
+    "tool_name, kwargs",
+    [
+        ("get_user_portfolio_summary", {"client_id": "kwargs-client"}),
+        ("get_market_news_and_sentiment", {"topic": "kwargs-topic"}),
+        ("get_citi_perspective", {"question": "kwargs-question"}),
+    ],
+)
+def test_cached_tools_accept_keyword_arguments(monkeypatch, tool_name, kwargs):
+    """ADK calls tools as func(**args), so the cache wrapper must accept keywords."""
+    calls = []
+
+    def fake_impl(arg):
+        calls.append(arg)
+        return f'{{"value": "{arg}"}}', True
+
+    monkeypatch.setattr(tools, f"_{tool_name}", fake_impl)
+    tool = getattr(tools, tool_name)
+    (value,) = kwargs.values()
+
+    assert asyncio.run(tool(**kwargs)) == f'{{"value": "{value}"}}'
+    # A repeat call, positional this time, is served from the cache
+    assert asyncio.run(tool(value)) == f'{{"value": "{value}"}}'
+    assert calls == [value]
+
+
+def test_error_responses_are_not_cached(monkeypatch):
+    calls = []
+
+    def failing_impl(question):
+        calls.append(question)
+        return '{"error": "unavailable"}', False
+
+    monkeypatch.setattr(tools, "_get_citi_perspective", failing_impl)
+
+    for _ in range(2):
+        assert asyncio.run(tools.get_citi_perspective(question="error-question")) == '{"error": "unavailable"}'
+    assert calls == ["error-question", "error-question"]
+
+
+def test_clients_are_created_once_under_concurrent_first_use(monkeypatch):
+    monkeypatch.setattr(tools, "_clients", {})
+    created = []
+    start = threading.Barrier(8)
+
+    def slow_factory():
+        created.append(object())
+        time.sleep(0.05)
+        return created[-1]
+
+    def first_use():
+        start.wait()
+        return tools._get_client("Test", slow_factory)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: first_use(), range(8)))
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
@@ -1,5 +1,11 @@
 import os
-import json
+import orjson
+import asyncio
+import inspect
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from alpha_vantage.timeseries import TimeSeries
 from google.cloud import bigquery
 from google.cloud import discoveryengine
@@ -13,112 +19,182 @@ ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", "demo") # Use 'demo'
 BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET", "fsi-banking-agentspace.awm")
 VERTEX_AI_SEARCH_DATASTORE_ID = os.getenv("VERTEX_AI_SEARCH_DATASTORE_ID", "citi_perspectives_datastore")
 
-# Initialize clients
-try:
-    bq_client = bigquery.Client(project=PROJECT_ID)
-    vertex_ai_search_client = discoveryengine.SearchServiceClient()
-except Exception as e:
-    print(f"Warning: Could not initialize Google Cloud clients: {e}")
-    bq_client = None
-    vertex_ai_search_client = None
+def _dumps(obj):
+    """Serializes a tool response to a JSON string."""
+    return orjson.dumps(obj).decode()
 
-def get_user_portfolio_summary(client_id: str) -> str:
+# The blocking implementations return (payload, cacheable) so the cache never has
+# to inspect the serialized payload to tell successes from errors.
+def _result(obj):
+    """Returns a cacheable tool response."""
+    return _dumps(obj), True
+
+def _error(message):
+    """Returns an error tool response, which is never cached."""
+    return _dumps({"error": message}), False
+
+# Clients are created lazily on first use and shared for the life of the process,
+# so importing this module (e.g. on worker startup) does no credential or channel setup.
+# Tools run on a thread pool, so creation is locked to build each client only once.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _get_client(name, factory):
+    """Returns the shared client built by factory, or None if it could not be created."""
+    try:
+        return _clients[name]
+    except KeyError:
+        pass
+    with _clients_lock:
+        if name not in _clients:
+            try:
+                _clients[name] = factory()
+            except Exception as e:
+                print(f"Warning: Could not initialize {name} client: {e}")
+                _clients[name] = None
+        return _clients[name]
+
+def _get_bq_client():
+    """Returns the shared BigQuery client, or None if it could not be created."""
+    return _get_client("BigQuery", lambda: bigquery.Client(project=PROJECT_ID))
+
+def _get_vertex_ai_search_client():
+    """Returns the shared Vertex AI Search client, or None if it could not be created."""
+    return _get_client("Vertex AI Search", lambda: discoveryengine.SearchServiceClient())
+
+# The tool backends are blocking HTTP/gRPC calls. The public tools are async and run
+# them on this pool so a slow query never stalls the event loop streaming audio.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+async def _run_blocking(func, *args):
+    """Runs a blocking tool implementation on the tool thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(_TOOL_POOL, func, *args)
+
+def _ttl_cached(ttl, key=lambda *args: args):
     """
-    Retrieves the user's portfolio summary from the BigQuery holdings table.
+    Caches an async tool's results for ttl seconds, keyed on key(*arguments).
 
-    Args:
-        client_id: The authenticated user's client ID.
+    ADK invokes tools with keyword arguments, so calls are bound to the tool's
+    signature first and the key is built from the bound arguments in order.
 
-    Returns:
-        A JSON string with the total market value and top 3 holdings,
-        or a message indicating that the portfolio could not be retrieved.
+    The decorated coroutine returns a (payload, cacheable) pair and callers get
+    just the payload. Only cacheable payloads are stored, so a transient failure
+    is retried on the next call. Concurrent calls with the same key share one
+    in-flight backend call.
     """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = TTLCache(maxsize=1024, ttl=ttl)
+        in_flight = {}
+
+        def store(cache_key, task):
+            in_flight.pop(cache_key, None)
+            if task.cancelled() or task.exception() is not None:
+                return
+            payload, cacheable = task.result()
+            if cacheable:
+                cache[cache_key] = payload
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache_key = key(*bound.args)
+            result = cache.get(cache_key)
+            if result is not None:
+                return result
+            task = in_flight.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(func(*bound.args, **bound.kwargs))
+                in_flight[cache_key] = task
+                task.add_done_callback(functools.partial(store, cache_key))
+            # Shield so one caller being cancelled does not cancel the call for the others
+            payload, _ = await asyncio.shield(task)
+            return payload
+
+        return wrapper
+    return decorator
+
+# The window SUM is evaluated over all of the client's holdings before LIMIT applies.
+_PORTFOLIO_QUERY = f"""
+    SELECT
+        ticker,
+        security_name,
+        market_value,
+        SUM(market_value) OVER () AS total_market_value
+    FROM
+        `{PROJECT_ID}.{BIGQUERY_DATASET}.holdings`
+    WHERE
+        client_id = @client_id
+    ORDER BY
+        market_value DESC
+    LIMIT 3;
+"""
+
+def _get_user_portfolio_summary(client_id: str) -> tuple[str, bool]:
+    """Blocking implementation of get_user_portfolio_summary."""
+    bq_client = _get_bq_client()
     if not bq_client:
-        return json.dumps({"error": "The BigQuery client is not available. Please check your Google Cloud credentials."})
-
-    query = f"""
-        WITH ClientHoldings AS (
-            SELECT
-                ticker,
-                security_name,
-                market_value
-            FROM
-                `{PROJECT_ID}.{BIGQUERY_DATASET}.holdings`
-            WHERE
-                client_id = @client_id
-        ),
-        TotalValue AS (
-            SELECT
-                SUM(market_value) AS total_market_value
-            FROM
-                ClientHoldings
-        )
-        SELECT
-            h.ticker,
-            h.security_name,
-            h.market_value,
-            tv.total_market_value
-        FROM
-            ClientHoldings h,
-            TotalValue tv
-        ORDER BY
-            h.market_value DESC
-        LIMIT 3;
-    """
+        return _error("The BigQuery client is not available. Please check your Google Cloud credentials.")
+
     job_config = bigquery.QueryJobConfig(
         query_parameters=[
             bigquery.ScalarQueryParameter("client_id", "STRING", client_id),
         ]
     )
     try:
-        query_job = bq_client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        query_job = bq_client.query(_PORTFOLIO_QUERY, job_config=job_config)
 
-        if not results:
-            return json.dumps({"message": "I could not retrieve your portfolio data at this time."})
+        total_market_value = 0
+        top_holdings = []
+        for row in query_job.result(max_results=3):
+            total_market_value = row.total_market_value
+            top_holdings.append({
+                "ticker": row.ticker,
+                "security_name": row.security_name,
+                "market_value": row.market_value,
+            })
 
-        total_market_value = results[0].total_market_value if results else 0
+        if not top_holdings:
+            return _result({"message": "I could not retrieve your portfolio data at this time."})
 
         response = {
             "total_market_value": total_market_value,
-            "top_holdings": [
-                {
-                    "ticker": row.ticker,
-                    "security_name": row.security_name,
-                    "market_value": row.market_value,
-                }
-                for row in results
-            ],
+            "top_holdings": top_holdings,
         }
-        return json.dumps(response)
+        return _result(response)
     except Exception as e:
         print(f"Error querying BigQuery: {e}")
-        return json.dumps({"error": "An error occurred while retrieving portfolio data."})
-
-
-from alpha_vantage.fundamentaldata import FundamentalData
+        return _error("An error occurred while retrieving portfolio data.")
 
-def get_market_news_and_sentiment(topic: str) -> str:
+@_ttl_cached(ttl=60)
+async def get_user_portfolio_summary(client_id: str) -> str:
     """
-    Fetches the latest news articles and sentiment for a given topic or company ticker.
+    Retrieves the user's portfolio summary from the BigQuery holdings table.
 
     Args:
-        topic: The company ticker or topic to search for.
+        client_id: The authenticated user's client ID.
 
     Returns:
-        A JSON string summarizing up to 5 news articles, including title, summary, and sentiment.
+        A JSON string with the total market value and top 3 holdings,
+        or a message indicating that the portfolio could not be retrieved.
     """
+    return await _run_blocking(_get_user_portfolio_summary, client_id)
+
+
+from alpha_vantage.fundamentaldata import FundamentalData
+
+def _get_market_news_and_sentiment(topic: str) -> tuple[str, bool]:
+    """Blocking implementation of get_market_news_and_sentiment."""
     if not ALPHA_VANTAGE_API_KEY or ALPHA_VANTAGE_API_KEY == "demo":
-        return json.dumps({
-            "error": "Missing or invalid Alpha Vantage API key. Please set the ALPHA_VANTAGE_API_KEY environment variable."
-        })
+        return _error("Missing or invalid Alpha Vantage API key. Please set the ALPHA_VANTAGE_API_KEY environment variable.")
 
     try:
         fd = FundamentalData(key=ALPHA_VANTAGE_API_KEY, output_format='json')
         news_data, _ = fd.get_news_sentiment(tickers=topic, limit=5) # Limit to 5 articles
 
         if not news_data or 'feed' not in news_data or not news_data['feed']:
-             return json.dumps({"articles": [], "message": f"No news found for {topic}."})
+             return _result({"articles": [], "message": f"No news found for {topic}."})
 
         articles = []
         for item in news_data['feed']:
@@ -132,25 +208,34 @@ def get_market_news_and_sentiment(topic: str) -> str:
                 "overall_sentiment": ticker_sentiment.get('ticker_sentiment_label', 'N/A') if ticker_sentiment else 'N/A'
             })
 
-        return json.dumps({"articles": articles})
+        return _result({"articles": articles})
     except Exception as e:
         print(f"Error fetching market news from Alpha Vantage: {e}")
         # This could be due to an invalid API key, network issues, or an invalid ticker.
         # Provide a more specific error message if possible.
         error_message = "An error occurred while fetching market news. The ticker symbol may be invalid or the API key may have expired."
-        return json.dumps({"error": error_message})
-
+        return _error(error_message)
 
-def get_citi_perspective(question: str) -> str:
+@_ttl_cached(ttl=30, key=lambda topic: topic.upper())
+async def get_market_news_and_sentiment(topic: str) -> str:
     """
-    Queries the Citi internal knowledge base via Vertex AI Search to get the official Citi perspective.
+    Fetches the latest news articles and sentiment for a given topic or company ticker.
 
     Args:
-        question: The user's question about Citi's opinion or recommendations.
+        topic: The company ticker or topic to search for.
 
     Returns:
-        A JSON string containing a summary of the official Citi perspective.
+        A JSON string summarizing up to 5 news articles, including title, summary, and sentiment.
     """
+    return await _run_blocking(_get_market_news_and_sentiment, topic)
+
+
+def _get_citi_perspective(question: str) -> tuple[str, bool]:
+    """Blocking implementation of get_citi_perspective."""
+    vertex_ai_search_client = _get_vertex_ai_search_client()
+    if not vertex_ai_search_client:
+        return _error("The Vertex AI Search client is not available. Please check your Google Cloud credentials.")
+
     # This is a simplified example of a Vertex AI Search call.
     # The actual implementation may require more complex request construction.
     serving_config = vertex_ai_search_client.serving_config_path(
@@ -169,13 +254,26 @@ def get_citi_perspective(question: str) -> str:
     try:
         search_response = vertex_ai_search_client.search(request)
         if not search_response.results:
-            return json.dumps({"summary": "I could not find an official Citi perspective on this topic."})
+            return _result({"summary": "I could not find an official Citi perspective on this topic."})
 
         # Extract the summary from the most relevant result
         top_result = search_response.results[0].document
         summary = top_result.derived_struct_data.get('summary', 'No summary available.')
 
-        return json.dumps({"summary": summary})
+        return _result({"summary": summary})
     except Exception as e:
         print(f"Error querying Vertex AI Search: {e}")
-        return json.dumps({"error": "An error occurred while retrieving the Citi perspective."})
\ No newline at end of file
+        return _error("An error occurred while retrieving the Citi perspective.")
+
+@_ttl_cached(ttl=30)
+async def get_citi_perspective(question: str) -> str:
+    """
+    Queries the Citi internal knowledge base via Vertex AI Search to get the official Citi perspective.
+
+    Args:
+        question: The user's question about Citi's opinion or recommendations.
+
+    Returns:
+        A JSON string containing a summary of the official Citi perspective.
+    """
+    return await _run_blocking(_get_citi_perspective, question)
\ No newline at end of file